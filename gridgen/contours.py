@@ -18,12 +18,19 @@ from matplotlib.axes import Axes
 from functools import wraps
 
 def timeit(func):
+    """Time ``func`` through the package logger; a no-op unless GRIDGEN_TIMEIT is set."""
+    if not os.environ.get('GRIDGEN_TIMEIT'):
+        return func
+
+    # Resolve once at decoration time and log at INFO — get_logger re-pins the
+    # level on every call, which would silently drop per-call DEBUG records
+    logger = get_logger(__name__)
+
     @wraps(func)
     def wrapper(*args, **kwargs):
-        start = time.time()
+        start = time.perf_counter()
         result = func(*args, **kwargs)
-        end = time.time()
-        print(f"{func.__name__} took {end - start:.4f} seconds")
+        logger.info('%s took %.4f seconds', func.__name__, time.perf_counter() - start)
         return result
     return wrapper
 
@@ -4,13 +4,16 @@ import numpy as np
 import os
 import matplotlib.pyplot as plt
 import matplotlib.patches as mpatches
-import matplotlib.cm as cm
 from scipy.spatial import Voronoi, voronoi_plot_2d
 from shapely.geometry import Polygon
 from typing import Dict, List, Tuple, Union
 from matplotlib.lines import Line2D
 from matplotlib.colors import ListedColormap
 from gridgen.logger import get_logger
+from functools import lru_cache, wraps
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional, Tuple, Dict, Any, List
 from scipy.ndimage import distance_transform_edt
 from skimage.measure import label
@@ -20,15 +23,59 @@ import numpy as np
 from shapely.geometry import Polygon, box
 
 def timeit(func):
+    """Time ``func`` through the package logger; a no-op unless GRIDGEN_TIMEIT is set."""
+    if not os.environ.get('GRIDGEN_TIMEIT'):
+        return func
+
+    # Resolve once at decoration time and log at INFO — get_logger re-pins the
+    # level on every call, which would silently drop per-call DEBUG records
+    logger = get_logger(__name__)
+
     @wraps(func)
     def wrapper(*args, **kwargs):
-        start = time.time()
+        start = time.perf_counter()
         result = func(*args, **kwargs)
-        end = time.time()
-        print(f"{func.__name__} took {end - start:.4f} seconds")
+        logger.info('%s took %.4f seconds', func.__name__, time.perf_counter() - start)
         return result
     return wrapper
 
+@lru_cache(maxsize=16)
+def _rect_kernel(width: int, height: Optional[int] = None) -> np.ndarray:
+    """Cached rectangular structuring element, shared across morphology calls."""
+    return cv2.getStructuringElement(cv2.MORPH_RECT, (width, height if height is not None else width))
+
+
+# Structured key for the per-object masks produced during Voronoi-limited
+# expansion; aggregation groups on its fields, so category names may contain
+# underscores without breaking the grouping
+MaskKey = namedtuple('MaskKey', 'category kind distance parent_id')
+
+
+def _connected_components(mask: np.ndarray) -> np.ndarray:
+    """
+    Label connected components with OpenCV (8-connectivity, int32 output),
+    matching skimage.measure.label defaults but substantially faster.
+
+    :param mask: Binary mask.
+    :return: int32 label image.
+    """
+    _, labels = cv2.connectedComponents(mask.astype(np.uint8), connectivity=8, ltype=cv2.CV_32S)
+    return labels
+
+
+def _background_edt(seed_labeled: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Compute the Euclidean distance transform of the background of a labeled seed mask,
+    together with the nearest-seed index arrays, in a single pass.
+
+    :param seed_labeled: Labeled seed mask (zero is background).
+    :return: Tuple of (float32 distance map, nearest-seed index arrays).
+    """
+    dist_map, nearest_indices = distance_transform_edt(seed_labeled == 0, return_indices=True)
+    # Distances are only compared against integer ring thresholds — float32 halves the bandwidth
+    return dist_map.astype(np.float32, copy=False), nearest_indices
+
+
 class GetMasks:
     def __init__(self, logger: Optional[logging.Logger] = None, image_shape: Optional[Tuple[int, int]] = None):
         """
@@ -54,11 +101,10 @@ class GetMasks:
         """
         num_labels, labels, stats, _ = cv2.connectedComponentsWithStats(mask.astype(np.uint8), connectivity=8)
 
-        output_mask = np.zeros_like(mask, dtype=np.uint8)
-        for i in range(1, num_labels):  # skip background
-            area = stats[i, cv2.CC_STAT_AREA]
-            if area >= min_area:
-                output_mask[labels == i] = 1
+        # Area-threshold LUT indexed by component id — one gather instead of a per-component pass
+        keep = stats[:, cv2.CC_STAT_AREA] >= min_area
+        keep[0] = False  # background
+        output_mask = keep.astype(np.uint8)[labels]
         return output_mask
 
     def filter_labeled_mask_by_area(self, mask: np.ndarray, min_area: int) -> np.ndarray:
@@ -71,12 +117,15 @@ class GetMasks:
         :return: Filtered labeled mask.
         """
         mask = mask.astype(np.int32)
-        unique_labels, counts = np.unique(mask, return_counts=True)
-        labels_to_keep = unique_labels[(counts >= min_area) & (unique_labels != 0)]
+        # bincount is a sort-free O(N) pass, unlike np.unique(return_counts=True)
+        counts = np.bincount(mask.ravel())
+        labels_to_keep = np.nonzero(counts >= min_area)[0]
+        labels_to_keep = labels_to_keep[labels_to_keep != 0]
 
-        filtered_mask = np.zeros_like(mask, dtype=np.int32)
-        for label in labels_to_keep:
-            filtered_mask[mask == label] = label
+        # LUT remap: zero for dropped labels, identity for kept ones — one gather over the image
+        lut = np.zeros(counts.size, dtype=np.int32)
+        lut[labels_to_keep] = labels_to_keep
+        filtered_mask = lut[mask]
 
         # if logger:
         self.logger.info(f'Filtered labeled mask by area >= {min_area}, kept {len(labels_to_keep)} components.')
@@ -118,7 +167,7 @@ class GetMasks:
         :param kernel_size: Size of the structuring element.
         :return: Processed binary mask.
         """
-        kernel = np.ones((kernel_size, kernel_size), np.uint8)
+        kernel = _rect_kernel(kernel_size)
 
         if operation == "open":
             result = cv2.morphologyEx(mask, cv2.MORPH_OPEN, kernel)
@@ -144,8 +193,13 @@ class GetMasks:
         :return: Resulting mask after subtraction.
         """
         result_mask = base_mask.copy()
-        for mask in masks:
-            result_mask = cv2.subtract(result_mask, mask)
+        if masks:
+            # Union the subtrahends first, then clear in one pass instead of
+            # streaming the full image through cv2.subtract once per mask
+            combined = np.zeros_like(base_mask, dtype=bool)
+            for mask in masks:
+                np.logical_or(combined, mask.astype(bool, copy=False), out=combined)
+            result_mask[combined] = 0
         self.logger.info(f'Subtracted masks from base mask.')
         return result_mask
 
@@ -196,28 +250,32 @@ class GetMasks:
             self.logger.error('The number of masks and mask names must be the same.')
             return
 
-        # Create a background image filled with the background color
-        background = np.full((self.height, self.width, 3), background_color)
+        # Build a label image plus palette, then color everything with one LUT gather
+        # instead of rewriting the 3-channel background once per mask
+        label_img = np.zeros((self.height, self.width), dtype=np.int32)
+        palette = np.empty((len(masks) + 1, 3), dtype=np.uint8)
+        palette[0] = background_color
 
         # Create a list to store the patches for the legend
         legend_patches = []
 
         # Choose a colormap based on the number of masks
-        colormap = cm.get_cmap('tab10') if len(masks) <= 10 else cm.get_cmap('tab20')
+        colormap = plt.get_cmap('tab10') if len(masks) <= 10 else plt.get_cmap('tab20')
 
-        # Add each mask to the background image
         for i, (mask, mask_name) in enumerate(zip(masks, mask_names)):
             # Choose a color for the mask
             if mask_colors and mask_name in mask_colors:
                 mask_color = np.array(mask_colors[mask_name])
             else:
                 mask_color = (np.array(colormap(i % colormap.N)[:3]) * 255).astype(int)
-            # Apply the mask color to the mask image
-            background[mask!=0] = mask_color
+            palette[i + 1] = mask_color
+            label_img[mask != 0] = i + 1
 
             # Create a patch for the legend
             legend_patches.append(mpatches.Patch(color=mask_color / 255, label=mask_name))
 
+        background = palette[label_img]
+
         # Flip the mask horizontally and rotate 90 degrees clockwise
         background = np.fliplr(background)
         background = np.rot90(background, k=1)
@@ -270,7 +328,7 @@ class ConstrainedMaskExpansion(GetMasks):
             raise ValueError("Seed mask cannot be None.")
 
         self.seed_mask_raw = seed_mask.astype(np.uint8)
-        self.seed_mask = label(self.seed_mask_raw)  # connected components
+        self.seed_mask = _connected_components(self.seed_mask_raw)  # int32 connected components
         self.constraint_mask = (
             constraint_mask.astype(np.uint8)
             if constraint_mask is not None
@@ -289,6 +347,7 @@ class ConstrainedMaskExpansion(GetMasks):
         expansion_pixels: List[int],
         min_area: Optional[int] = None,
         restrict_to_limit: bool = True,
+        pack: bool = False,
     ) -> None:
         """
         Expands the seed mask outward by specified pixel distances and stores binary, labeled,
@@ -297,23 +356,36 @@ class ConstrainedMaskExpansion(GetMasks):
         :param expansion_pixels: List of expansion distances (in pixels) from the seed mask.
         :param min_area: Optional minimum area for keeping connected components in each expansion ring.
         :param restrict_to_limit: If True, expansion is limited to the constraint mask.
+        :param pack: If True, store binary expansions bit-packed along the row axis
+            (8x smaller); read them back with :meth:`unpack_expansion`.
         """
         sorted_dists = sorted(expansion_pixels)
-        dist_map = distance_transform_edt(self.seed_mask == 0)
+        dist_map, nearest_indices = _background_edt(self.seed_mask)
+        nearest_labels = self.seed_mask[tuple(nearest_indices)]
+
+        # Assign every background pixel to its ring in one vectorized sweep;
+        # bins are disjoint by construction, so no cumulative bookkeeping is needed.
+        ring_id = np.digitize(dist_map, np.asarray(sorted_dists, dtype=dist_map.dtype), right=True)
+
+        # Fold background and constraint validity into ring_id once, so each
+        # ring below is a single equality test instead of three boolean passes
+        valid = self.seed_mask == 0
+        if restrict_to_limit:
+            valid &= self.constraint_mask.astype(bool)
+        ring_id[~valid] = len(sorted_dists)
+
+        # Preallocate one stack per output kind (rings + seed + constraint_remaining);
+        # the dicts hold views into these stacks, so per-ring results land in place
+        # instead of churning fresh H×W allocations
+        n_rings = len(sorted_dists)
+        binary_stack = np.zeros((n_rings + 2, self.height, self.width), dtype=np.uint8)
+        labeled_stack = np.zeros((n_rings + 2, self.height, self.width), dtype=np.int32)
+        referenced_stack = np.zeros((n_rings + 2, self.height, self.width), dtype=np.int32)
 
         previous_mask = np.zeros_like(self.seed_mask, dtype=bool)
 
-        for dist in sorted_dists:
-            if dist == sorted_dists[0]:
-                ring = (dist_map <= dist) & (self.seed_mask == 0)
-            else:
-                prev_dist = sorted_dists[sorted_dists.index(dist) - 1]
-                ring = (dist_map <= dist) & (dist_map > prev_dist) & (self.seed_mask == 0)
-
-            if restrict_to_limit:
-                ring &= self.constraint_mask.astype(bool)
-
-            ring &= ~previous_mask
+        for i, dist in enumerate(sorted_dists):
+            ring = ring_id == i
 
             if min_area:
                 ring = self.filter_binary_mask_by_area(ring.astype(np.uint8), min_area).astype(bool)
@@ -321,58 +393,81 @@ class ConstrainedMaskExpansion(GetMasks):
             previous_mask |= ring
 
             # Store binary mask
-            self.binary_expansions[f"expansion_{dist}"] = ring.astype(np.uint8)
+            binary_stack[i][...] = ring
+            self.binary_expansions[f"expansion_{dist}"] = (
+                np.packbits(binary_stack[i], axis=-1) if pack else binary_stack[i]
+            )
 
             # Store labeled components using skimage
-            self.labeled_expansions[f"expansion_{dist}"] = label(ring.astype(np.uint8))
+            labeled_stack[i][...] = _connected_components(binary_stack[i])
+            self.labeled_expansions[f"expansion_{dist}"] = labeled_stack[i]
 
             # Store label-referenced expansion using seed_mask
-            referenced = self.propagate_labels(self.seed_mask, ring)
-            self.referenced_expansions[f"expansion_{dist}"] = referenced
+            referenced_stack[i][...] = self.propagate_labels(self.seed_mask, ring, nearest_labels)
+            self.referenced_expansions[f"expansion_{dist}"] = referenced_stack[i]
+
+        binary_stack[n_rings][...] = self.seed_mask > 0
+        labeled_stack[n_rings][...] = self.seed_mask
+        referenced_stack[n_rings][...] = self.seed_mask
+        self.binary_expansions["seed_mask"] = (
+            np.packbits(binary_stack[n_rings], axis=-1) if pack else binary_stack[n_rings]
+        )
+        self.labeled_expansions["seed_mask"] = labeled_stack[n_rings]
+        self.referenced_expansions["seed_mask"] = referenced_stack[n_rings]
 
-        self.binary_expansions["seed_mask"] = (self.seed_mask > 0).astype(np.uint8)
-        self.labeled_expansions["seed_mask"] = self.seed_mask.copy()
-        self.referenced_expansions["seed_mask"] = self.seed_mask.copy()
+        binary_stack[n_rings + 1][...] = self.constraint_mask.astype(bool) & ~previous_mask
+        self.binary_expansions["constraint_remaining"] = (
+            np.packbits(binary_stack[n_rings + 1], axis=-1) if pack else binary_stack[n_rings + 1]
+        )
+        self.labeled_expansions["constraint_remaining"] = labeled_stack[n_rings + 1]
+        self.referenced_expansions["constraint_remaining"] = referenced_stack[n_rings + 1]
 
-        constraint_remaining = (self.constraint_mask.astype(bool) & ~previous_mask).astype(np.uint8)
-        self.binary_expansions["constraint_remaining"] = constraint_remaining
-        self.labeled_expansions["constraint_remaining"] = np.zeros_like(self.seed_mask, dtype=np.int32)
-        self.referenced_expansions["constraint_remaining"] = np.zeros_like(self.seed_mask, dtype=np.int32)
+    def unpack_expansion(self, key: str) -> np.ndarray:
+        """
+        Returns the binary expansion stored under ``key`` as a bool mask,
+        unpacking bit-packed storage written with ``expand_mask(pack=True)``.
+
+        :param key: Key into ``binary_expansions``.
+        :return: Boolean mask of shape (height, width).
+        """
+        return np.unpackbits(self.binary_expansions[key], axis=-1, count=self.width).view(bool)
 
 
-    def propagate_labels(self, seed_labeled: np.ndarray, expansion_mask: np.ndarray) -> np.ndarray:
+    def propagate_labels(
+        self,
+        seed_labeled: np.ndarray,
+        expansion_mask: np.ndarray,
+        nearest_labels: Optional[np.ndarray] = None,
+    ) -> np.ndarray:
         """
-        Propagates labels from the seed labeled mask into the expansion region using morphological dilation.
+        Propagates labels from the seed labeled mask into the expansion region by assigning
+        each expansion pixel the label of its nearest seed pixel (Voronoi-via-EDT).
 
         :param seed_labeled: Labeled seed mask (non-zero values represent different components).
         :param expansion_mask: Binary mask representing the region where labels should propagate.
+        :param nearest_labels: Optional precomputed nearest-seed label image (the seed labels
+            gathered through ``_background_edt`` indices); computed here if not given.
         :return: Labeled mask with propagated labels in the expansion area.
         """
-        output = np.zeros_like(seed_labeled, dtype=np.int32)
-        output[seed_labeled > 0] = seed_labeled[seed_labeled > 0]
-
-        kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (3, 3))
+        output = np.where(seed_labeled > 0, seed_labeled, 0).astype(np.int32)
         expansion_mask = expansion_mask.astype(bool)
-        iteration = 0
 
-        while True:
-            iteration += 1
-            prev = output.copy()
+        # Nothing to fill (common for the last ring once the constraint is exhausted)
+        if not expansion_mask.any():
+            return output
 
-            mask_to_fill = (output == 0) & expansion_mask
+        # A single seed component can only propagate its own label
+        if int(seed_labeled.max()) == 1:
+            output[expansion_mask] = 1
+            return output
 
-            # OpenCV only supports certain dtypes for dilation — use float32 safely
-            dilated = cv2.dilate(output.astype(np.float32), kernel)
-            dilated = dilated.astype(np.int32)
-
-            output[mask_to_fill] = dilated[mask_to_fill]
+        if nearest_labels is None:
+            nearest_indices = distance_transform_edt(
+                seed_labeled == 0, return_indices=True, return_distances=False
+            )
+            nearest_labels = seed_labeled[tuple(nearest_indices)]
 
-            if np.array_equal(output, prev):
-                break
-            if iteration > 1000:
-                if self.logger:
-                    self.logger.warning("Label propagation exceeded 1000 iterations.")
-                break
+        output[expansion_mask] = nearest_labels[expansion_mask]
 
         return output
 
@@ -449,7 +544,8 @@ class SingleClassObjectAnalysis(GetMasks):
     def get_objects_expansion(
         self,
         expansions_pixels: Optional[List[int]] = None,
-        filter_area: Optional[int] = None
+        filter_area: Optional[int] = None,
+        pack: bool = False
     ) -> None:
         """
         Expand the object mask using distance-based rings and optionally filter each ring
@@ -457,6 +553,8 @@ class SingleClassObjectAnalysis(GetMasks):
 
         :param expansions_pixels: List of pixel distances for expansion.
         :param filter_area: Minimum area threshold to retain components in each expansion ring.
+        :param pack: If True, binary expansions are kept bit-packed row-wise; use
+            :meth:`unpack_expansion` to recover the bool masks.
 
         """
         if self.mask_object_SA is None:
@@ -466,68 +564,95 @@ class SingleClassObjectAnalysis(GetMasks):
         if expansions_pixels is None:
             expansions_pixels = []
 
-        seed_mask = label(self.mask_object_SA)
-        dist_map = distance_transform_edt(seed_mask == 0)
-        previous_mask = np.zeros_like(seed_mask, dtype=bool)
-
-        for i, dist in enumerate(sorted(expansions_pixels)):
-            if i == 0:
-                ring = (dist_map <= dist) & (seed_mask == 0)
-            else:
-                prev_dist = sorted(expansions_pixels)[i - 1]
-                ring = (dist_map <= dist) & (dist_map > prev_dist) & (seed_mask == 0)
-
-            ring &= ~previous_mask
+        seed_mask = _connected_components(self.mask_object_SA)
+        dist_map, nearest_indices = _background_edt(seed_mask)
+        nearest_labels = seed_mask[tuple(nearest_indices)]
+
+        # Assign every background pixel to its ring in one vectorized sweep;
+        # bins are disjoint by construction, so no cumulative bookkeeping is needed.
+        sorted_dists = sorted(expansions_pixels)
+        ring_id = np.digitize(dist_map, np.asarray(sorted_dists, dtype=dist_map.dtype), right=True)
+        ring_id[seed_mask != 0] = len(sorted_dists)
+
+        # Preallocate one stack per output kind (rings + seed); the dicts hold views
+        # into these stacks, so per-ring results land in place instead of churning
+        # fresh H×W allocations
+        n_rings = len(sorted_dists)
+        binary_stack = np.zeros((n_rings + 1, self.height, self.width), dtype=np.uint8)
+        labeled_stack = np.zeros((n_rings + 1, self.height, self.width), dtype=np.int32)
+        referenced_stack = np.zeros((n_rings + 1, self.height, self.width), dtype=np.int32)
+
+        for i, dist in enumerate(sorted_dists):
+            ring = ring_id == i
             if filter_area:
                 ring = self.get_masks_instance.filter_binary_mask_by_area(ring.astype(np.uint8), filter_area).astype(bool)
 
-            previous_mask |= ring
-
             key = f"expansion_{dist}"
-            self.binary_expansions[key] = ring.astype(np.uint8)
-            self.labeled_expansions[key] = label(ring.astype(np.uint8))
-            self.referenced_expansions[key] = self.propagate_labels(seed_mask, ring)
+            binary_stack[i][...] = ring
+            labeled_stack[i][...] = _connected_components(binary_stack[i])
+            referenced_stack[i][...] = self.propagate_labels(seed_mask, ring, nearest_labels)
+            self.binary_expansions[key] = np.packbits(binary_stack[i], axis=-1) if pack else binary_stack[i]
+            self.labeled_expansions[key] = labeled_stack[i]
+            self.referenced_expansions[key] = referenced_stack[i]
 
         # Store the base seed info
-        self.binary_expansions["seed_mask"] = (seed_mask > 0).astype(np.uint8)
-        self.labeled_expansions["seed_mask"] = seed_mask.copy()
-        self.referenced_expansions["seed_mask"] = seed_mask.copy()
+        binary_stack[n_rings][...] = seed_mask > 0
+        labeled_stack[n_rings][...] = seed_mask
+        referenced_stack[n_rings][...] = seed_mask
+        self.binary_expansions["seed_mask"] = (
+            np.packbits(binary_stack[n_rings], axis=-1) if pack else binary_stack[n_rings]
+        )
+        self.labeled_expansions["seed_mask"] = labeled_stack[n_rings]
+        self.referenced_expansions["seed_mask"] = referenced_stack[n_rings]
 
-    def propagate_labels(self, seed_labeled: np.ndarray, expansion_mask: np.ndarray) -> np.ndarray:
+    def unpack_expansion(self, key: str) -> np.ndarray:
         """
-        Propagate labeled regions from a seed mask into the expansion area using iterative dilation.
+        Recover the bool mask for a binary expansion written with
+        ``get_objects_expansion(pack=True)``.
+
+        :param key: Key into ``binary_expansions``.
+        :return: Boolean mask of shape (height, width).
+        """
+        return np.unpackbits(self.binary_expansions[key], axis=-1, count=self.width).view(bool)
+
+    def propagate_labels(
+        self,
+        seed_labeled: np.ndarray,
+        expansion_mask: np.ndarray,
+        nearest_labels: Optional[np.ndarray] = None,
+    ) -> np.ndarray:
+        """
+        Propagate labeled regions from a seed mask into the expansion area by assigning
+        each expansion pixel the label of its nearest seed pixel (Voronoi-via-EDT).
 
         :param seed_labeled: Input labeled mask where each connected component has a unique integer label.
         :param expansion_mask: Binary mask indicating the region where labels should expand.
+        :param nearest_labels: Optional precomputed nearest-seed label image (the seed labels
+            gathered through ``_background_edt`` indices); computed here if not given.
         :return: A labeled mask with labels propagated into the expansion region.
         """
-        output = np.zeros_like(seed_labeled, dtype=np.int32)
-        output[seed_labeled > 0] = seed_labeled[seed_labeled > 0]
-
-        kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (3, 3))
+        output = np.where(seed_labeled > 0, seed_labeled, 0).astype(np.int32)
         expansion_mask = expansion_mask.astype(bool)
-        iteration = 0
 
-        while True:
-            iteration += 1
-            prev = output.copy()
+        # Nothing to fill (common for the last ring once the constraint is exhausted)
+        if not expansion_mask.any():
+            return output
 
-            mask_to_fill = (output == 0) & expansion_mask
-            dilated = cv2.dilate(output.astype(np.float32), kernel)
-            dilated = dilated.astype(np.int32)
+        # A single seed component can only propagate its own label
+        if int(seed_labeled.max()) == 1:
+            output[expansion_mask] = 1
+            return output
 
-            output[mask_to_fill] = dilated[mask_to_fill]
+        if nearest_labels is None:
+            nearest_indices = distance_transform_edt(
+                seed_labeled == 0, return_indices=True, return_distances=False
+            )
+            nearest_labels = seed_labeled[tuple(nearest_indices)]
 
-            if np.array_equal(output, prev):
-                break
-            if iteration > 1000:
-                if self.logger:
-                    self.logger.warning("Label propagation exceeded 1000 iterations.")
-                break
+        output[expansion_mask] = nearest_labels[expansion_mask]
 
         return output
 
-# Propagate labels: If performance is a concern, the dilation-based propagation loop can be optimized with a queue-based BFS flood-fill instead.
 
 class MultiClassObjectAnalysis(GetMasks):
     """
@@ -563,6 +688,7 @@ class MultiClassObjectAnalysis(GetMasks):
         self.all_centroids = None
         self.voronoi_regions = None
         self.voronoi_vertices = None
+        self._clipped_polygons_by_class = None
         self.save_path = save_path
 
         for class_label, contours in self.multiple_contours.items():
@@ -590,20 +716,42 @@ class MultiClassObjectAnalysis(GetMasks):
         if vor.points.shape[1] != 2:
             raise ValueError("Requires 2D input")
 
-        new_regions = []
-        new_vertices = vor.vertices.tolist()
-
         center = vor.points.mean(axis=0)
         if radius is None:
-            radius = vor.points.ptp().max() * 2
+            # ndarray.ptp() was removed in NumPy 2.0 — use the function with an explicit axis
+            radius = float(np.ptp(vor.points, axis=0).max()) * 2
+
+        ridge_points = np.asarray(vor.ridge_points)
+        ridge_vertices = np.asarray(vor.ridge_vertices)
+
+        # Far points for all infinite ridges in one vectorized batch: tangents,
+        # normals and outward directions computed over the whole ridge set at once
+        infinite = (ridge_vertices < 0).any(axis=1)
+        t = vor.points[ridge_points[:, 1]] - vor.points[ridge_points[:, 0]]
+        t /= np.linalg.norm(t, axis=1, keepdims=True)
+        n = np.stack([-t[:, 1], t[:, 0]], axis=1)
+        midpoints = vor.points[ridge_points].mean(axis=1)
+        direction = np.sign(((midpoints - center) * n).sum(axis=1))[:, None] * n
+        finite_end = np.where(ridge_vertices[:, 0] >= 0, ridge_vertices[:, 0], ridge_vertices[:, 1])
+        far_points = vor.vertices[finite_end] + direction * radius
+
+        # Preallocate the vertex array: original vertices followed by one shared
+        # far point per infinite ridge (the same far point serves both endpoints)
+        n_vertices = len(vor.vertices)
+        new_vertices = np.empty((n_vertices + int(infinite.sum()), 2))
+        new_vertices[:n_vertices] = vor.vertices
+        new_vertices[n_vertices:] = far_points[infinite]
+        far_index = np.full(len(ridge_points), -1)
+        far_index[infinite] = n_vertices + np.arange(int(infinite.sum()))
 
         # Map of all ridges for a point
         all_ridges = {}
-        for (p1, p2), (v1, v2) in zip(vor.ridge_points, vor.ridge_vertices):
-            all_ridges.setdefault(p1, []).append((p2, v1, v2))
-            all_ridges.setdefault(p2, []).append((p1, v1, v2))
+        for ridge_idx, (p1, p2) in enumerate(ridge_points):
+            all_ridges.setdefault(p1, []).append(ridge_idx)
+            all_ridges.setdefault(p2, []).append(ridge_idx)
 
         # Reconstruct finite polygons
+        new_regions = []
         for p1, region_index in enumerate(vor.point_region):
             vertices = vor.regions[region_index]
 
@@ -612,33 +760,24 @@ class MultiClassObjectAnalysis(GetMasks):
                 new_regions.append(vertices)
                 continue
 
-            ridges = all_ridges[p1]
             new_region = [v for v in vertices if v >= 0]
+            for ridge_idx in all_ridges.get(p1, []):
+                if infinite[ridge_idx]:
+                    new_region.append(int(far_index[ridge_idx]))
 
-            for p2, v1, v2 in ridges:
-                if v1 >= 0 and v2 >= 0:
-                    continue
-
-                t = vor.points[p2] - vor.points[p1]  # tangent
-                t /= np.linalg.norm(t)
-                n = np.array([-t[1], t[0]])  # normal vector
-
-                midpoint = vor.points[[p1, p2]].mean(axis=0)
-                direction = np.sign(np.dot(midpoint - center, n)) * n
-                far_point = vor.vertices[v1 if v1 >= 0 else v2] + direction * radius
-
-                new_vertices.append(far_point.tolist())
-                new_region.append(len(new_vertices) - 1)
+            if not new_region:
+                new_regions.append(new_region)
+                continue
 
             # Sort region counterclockwise
-            vs = np.array([new_vertices[v] for v in new_region])
+            vs = new_vertices[new_region]
             c = vs.mean(axis=0)
             angles = np.arctan2(vs[:, 1] - c[1], vs[:, 0] - c[0])
             new_region = [new_region[i] for i in np.argsort(angles)]
 
             new_regions.append(new_region)
 
-        return new_regions, np.asarray(new_vertices)
+        return new_regions, new_vertices
 
     def get_polygons_from_contours(self, contours):
         """
@@ -690,12 +829,7 @@ class MultiClassObjectAnalysis(GetMasks):
         centroids = []
         class_labels = []
         for class_label, contours in self.multiple_contours.items():
-            # for contour in contours:
-            #     if len(contour) < 4:
-            #         self.logger.warning(f"Skipping contour with less than 4 points for class '{class_label}'.")
-            #         continue
-            #     polygon = Polygon(contour)
-            for polygon in list_of_polygons:
+            for polygon in self.get_polygons_from_contours(contours):
                 centroids.append(polygon.centroid)
                 class_labels.append(class_label)
 
@@ -722,6 +856,7 @@ class MultiClassObjectAnalysis(GetMasks):
         self.vor = vor
         self.voronoi_regions = regions
         self.voronoi_vertices = vertices
+        self._clipped_polygons_by_class = None
 
     def get_voronoi_mask(self, category_name):
         """
@@ -736,19 +871,50 @@ class MultiClassObjectAnalysis(GetMasks):
 
         mask = np.zeros((self.height, self.width), dtype=np.uint8)
 
-        for idx, (label, region) in enumerate(zip(self.class_labels, self.voronoi_regions)):
-            if label != category_name:
-                continue
-            polygon = self.voronoi_vertices[region]
-            # Clip coordinates inside image boundaries
-            polygon[:, 0] = np.clip(polygon[:, 0], 0, self.width - 1)
-            polygon[:, 1] = np.clip(polygon[:, 1], 0, self.height - 1)
-            int_polygon = polygon.astype(np.int32)
-            if len(int_polygon) >= 3:
-                cv2.fillPoly(mask, [int_polygon], color=255)
+        polygons = self._get_clipped_polygons().get(category_name, [])
+        if polygons:
+            # One batched fillPoly call rasterizes the whole class in a single C sweep
+            cv2.fillPoly(mask, polygons, color=255)
 
         return mask
 
+    def compute_all_voronoi_masks(self) -> Dict[str, np.ndarray]:
+        """
+        Rasterizes the Voronoi masks of every class in parallel.
+
+        The underlying cv2.fillPoly calls release the GIL and each class writes
+        its own output buffer, so classes are mapped over a thread pool.
+
+        Returns:
+            Dict[str, np.ndarray]: Class label to binary Voronoi mask.
+        """
+        classes = list(self.multiple_contours.keys())
+        # Build the shared polygon cache up front so the workers only rasterize
+        self._get_clipped_polygons()
+        with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+            return dict(zip(classes, executor.map(self.get_voronoi_mask, classes)))
+
+    def _get_clipped_polygons(self):
+        """
+        Clipped int32 Voronoi polygon arrays grouped by class label, computed once
+        and cached so repeated get_voronoi_mask calls share the clip work.
+
+        Returns:
+            Dict[str, List[np.ndarray]]: Class label to list of polygon vertex arrays.
+        """
+        if self._clipped_polygons_by_class is None:
+            by_class = {}
+            for class_label, region in zip(self.class_labels, self.voronoi_regions):
+                polygon = self.voronoi_vertices[region]
+                # Clip coordinates inside image boundaries
+                polygon[:, 0] = np.clip(polygon[:, 0], 0, self.width - 1)
+                polygon[:, 1] = np.clip(polygon[:, 1], 0, self.height - 1)
+                int_polygon = polygon.astype(np.int32)
+                if len(int_polygon) >= 3:
+                    by_class.setdefault(class_label, []).append(int_polygon)
+            self._clipped_polygons_by_class = by_class
+        return self._clipped_polygons_by_class
+
     def expand_mask(self, mask, expansion_distance):
         """
         Expands a binary mask using morphological dilation.
@@ -761,8 +927,13 @@ class MultiClassObjectAnalysis(GetMasks):
             np.ndarray: The expanded mask minus the original mask.
         """
 
-        kernel = np.ones((expansion_distance, expansion_distance), np.uint8)
-        expanded_mask = cv2.dilate(mask, kernel, iterations=1)
+        if cv2.countNonZero(mask) == 0:
+            return np.zeros_like(mask)
+
+        # A rectangular dilation is separable: two 1D sweeps do O(d) work per
+        # pixel instead of the O(d²) full-kernel scan
+        expanded_mask = cv2.dilate(mask, _rect_kernel(expansion_distance, 1), iterations=1)
+        expanded_mask = cv2.dilate(expanded_mask, _rect_kernel(1, expansion_distance), iterations=1)
         expanded_mask = cv2.subtract(expanded_mask, mask)
         return expanded_mask
 
@@ -791,100 +962,116 @@ class MultiClassObjectAnalysis(GetMasks):
 
         parent_id_counter = 1  # unique ID for each original object across all classes
 
-        # Map from category -> list of (parent_id, mask)
+        # Map from category -> list of parent ids
         original_masks_info = {}
 
-        # Create binary masks for each individual contour, label them, assign parent IDs
+        # Draw every contour straight into the global parent-id canvas — one int32
+        # image instead of a fresh uint8 mask plus a labeling pass per contour
         for category_name, contours in self.multiple_contours.items():
-            category_masks = []
+            category_ids = []
             for contour in contours:
-                mask = np.zeros((self.height, self.width), dtype=np.uint8)
-                cv2.drawContours(mask, [contour], -1, 1, thickness=cv2.FILLED)
-                # Label connected components (should be 1 per mask but be safe)
-                labeled = label(mask > 0)
-                # Extract regionprops if needed, here we just assign parent_id directly
-                labeled_mask = np.zeros_like(labeled, dtype=np.int32)
-                # Assign the unique parent ID to all pixels in this object
-                labeled_mask[labeled > 0] = parent_id_counter
-
-                # Update global referenced mask
-                referenced_labeled_mask[labeled_mask > 0] = parent_id_counter
-
-                # Store original mask and label
-                masks[f'{category_name}_{parent_id_counter}'] = mask
-                labeled_masks[f'{category_name}_{parent_id_counter}'] = labeled_mask
-
-                category_masks.append((parent_id_counter, mask))
+                cv2.drawContours(referenced_labeled_mask, [contour], -1, int(parent_id_counter),
+                                 thickness=cv2.FILLED)
+                category_ids.append(parent_id_counter)
                 parent_id_counter += 1
-            original_masks_info[category_name] = category_masks
+            original_masks_info[category_name] = category_ids
+
+        # Per-object binary and labeled masks are derived from the canvas
+        for category_name, category_ids in original_masks_info.items():
+            for parent_id in category_ids:
+                obj = referenced_labeled_mask == parent_id
+                key = MaskKey(category_name, 'orig', 0, parent_id)
+                masks[key] = obj.astype(np.uint8)
+                labeled_masks[key] = np.where(obj, np.int32(parent_id), np.int32(0))
 
         # Step 2: Generate expansions and label them, mapping back to parent IDs
         expanded_masks = {}
         expanded_labeled_masks = {}
 
-        for category_name, masks_info in original_masks_info.items():
-            voronoi_mask = self.get_voronoi_mask(category_name)
-            for parent_id, base_mask in masks_info:
-                previous_expansion_mask = np.zeros((self.height, self.width), dtype=np.uint8)
-                for expansion_distance in expansion_distances:
-                    current_expansion_mask = self.expand_mask(base_mask.copy(), expansion_distance)
-                    current_expansion_mask = cv2.bitwise_and(current_expansion_mask,
-                                                             cv2.bitwise_not(previous_expansion_mask))
-                    current_expansion_mask = cv2.bitwise_and(current_expansion_mask, voronoi_mask)
-
-                    # Label this expanded mask (connected components)
-                    labeled_expansion = label(current_expansion_mask > 0)
-                    labeled_mask = np.zeros_like(labeled_expansion, dtype=np.int32)
-
-                    # For each component in expansion assign a unique label encoding:
-                    # parent_id * 1000 + expansion_distance (assuming expansion_distance < 1000)
-                    # This allows tracing expansions to parent
-                    # label_value = parent_id * 1000 + expansion_distance
-                    label_value = parent_id
+        # Rasterize every class's Voronoi cells once into a category-index map;
+        # with a parent -> category table, the expansion constraint becomes a
+        # single per-pixel test: a pixel may expand iff it lies in the territory
+        # of its nearest parent's own category
+        category_names = list(original_masks_info.keys())
+        category_map = np.zeros((self.height, self.width), dtype=np.int32)
+        clipped_polygons = self._get_clipped_polygons()
+        for cat_idx, category_name in enumerate(category_names, start=1):
+            polygons = clipped_polygons.get(category_name, [])
+            if polygons:
+                cv2.fillPoly(category_map, polygons, color=cat_idx)
+
+        parent_category = np.zeros(parent_id_counter, dtype=np.int32)
+        for cat_idx, category_name in enumerate(category_names, start=1):
+            parent_category[original_masks_info[category_name]] = cat_idx
+
+        # One distance transform over the union of all objects replaces a cv2.dilate
+        # per (object, ring): every background pixel gets its Euclidean distance to,
+        # and the parent id of, the nearest object, and rings fall out of one digitize
+        dist_map, nearest_indices = _background_edt(referenced_labeled_mask)
+        nearest_parent = referenced_labeled_mask[tuple(nearest_indices)]
+
+        sorted_dists = sorted(expansion_distances)
+        ring_id = np.digitize(dist_map, np.asarray(sorted_dists, dtype=dist_map.dtype), right=True)
+        ring_id[referenced_labeled_mask > 0] = len(sorted_dists)  # object interiors are not rings
+
+        allowed = category_map == parent_category[nearest_parent]
+
+        # Two scratch buffers are reused across every (parent, ring) iteration so
+        # the selection chain runs with out= writes instead of fresh temporaries
+        parent_region = np.empty(ring_id.shape, dtype=bool)
+        ring = np.empty(ring_id.shape, dtype=bool)
+
+        for category_name, category_ids in original_masks_info.items():
+            for parent_id in category_ids:
+                np.equal(nearest_parent, parent_id, out=parent_region)
+                parent_region &= allowed
+                if not parent_region.any():
+                    # No expandable territory for this parent — every ring is empty,
+                    # and the preallocated aggregates already cover the zero case
+                    continue
+                for i, expansion_distance in enumerate(sorted_dists):
+                    np.equal(ring_id, i, out=ring)
+                    ring &= parent_region
+                    current_expansion_mask = ring.astype(np.uint8)
 
-                    labeled_mask[labeled_expansion > 0] = label_value
+                    # Rings carry their parent id directly — no per-ring relabeling needed
+                    labeled_mask = np.where(ring, np.int32(parent_id), np.int32(0))
 
-                    # Update global referenced mask — careful to avoid overwriting originals
-                    referenced_labeled_mask[labeled_mask > 0] = label_value
+                    # Update global referenced mask; rings never cover object interiors,
+                    # so the originals cannot be overwritten
+                    referenced_labeled_mask[ring] = parent_id
 
-                    key = f'{category_name}_expansion_{expansion_distance}_parent_{parent_id}'
+                    key = MaskKey(category_name, 'ring', expansion_distance, parent_id)
                     expanded_masks[key] = current_expansion_mask
                     expanded_labeled_masks[key] = labeled_mask
 
-                    previous_expansion_mask = cv2.bitwise_or(previous_expansion_mask, current_expansion_mask)
-
         # Combine all masks and labeled masks
         masks.update(expanded_masks)
         labeled_masks.update(expanded_labeled_masks)
-        # Step 3: Aggregate masks by class and expansion name
-        aggregate_binary = {}
-        aggregate_labeled = {}
-        aggregate_referenced = {}
+        # Step 3: Aggregate masks by class and expansion name. The aggregate keys
+        # are known up front (categories × expansion distances), so all buffers
+        # are allocated once and updated in place
+        agg_keys = list(original_masks_info.keys()) + [
+            f"{category}_expansion_{dist}" for category in original_masks_info for dist in sorted_dists
+        ]
+        aggregate_binary = {k: np.zeros((self.height, self.width), dtype=np.uint8) for k in agg_keys}
+        aggregate_labeled = {k: np.zeros((self.height, self.width), dtype=np.int32) for k in agg_keys}
+        aggregate_referenced = {k: np.zeros((self.height, self.width), dtype=np.int32) for k in agg_keys}
 
         for key, mask in masks.items():
-            parts = key.split('_')
-
-            if 'expansion' in parts:
-                category = parts[0]
-                expansion_distance = parts[2]
-                agg_key = f"{category}_expansion_{expansion_distance}"
+            if key.kind == 'ring':
+                agg_key = f"{key.category}_expansion_{key.distance}"
             else:
-                category = parts[0]
-                agg_key = category
+                agg_key = key.category
 
-            if agg_key not in aggregate_binary:
-                aggregate_binary[agg_key] = np.zeros_like(mask)
-                aggregate_labeled[agg_key] = np.zeros_like(mask, dtype=np.int32)
-                aggregate_referenced[agg_key] = np.zeros_like(mask, dtype=np.int32)
-
-            aggregate_binary[agg_key] = cv2.bitwise_or(aggregate_binary[agg_key], mask)
-            aggregate_labeled[agg_key] = np.maximum(aggregate_labeled[agg_key], labeled_masks[key])
+            # Each pixel belongs to at most one (parent, ring) within an aggregate,
+            # so direct masked writes replace the compare-and-merge np.maximum passes
+            covered = mask != 0
+            np.bitwise_or(aggregate_binary[agg_key], mask, out=aggregate_binary[agg_key])
+            np.copyto(aggregate_labeled[agg_key], labeled_masks[key], where=covered)
 
             # Referenced mask is pulled from the global referenced_labeled_mask
-            aggregate_referenced[agg_key] = np.maximum(
-                aggregate_referenced[agg_key],
-                np.where(mask > 0, referenced_labeled_mask, 0)
-            )
+            np.copyto(aggregate_referenced[agg_key], referenced_labeled_mask, where=covered)
 
         # Final output
         self.binary_masks = aggregate_binary
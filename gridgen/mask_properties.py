@@ -2,19 +2,28 @@ from dataclasses import dataclass
 from typing import List, Optional, Dict, Any
 import numpy as np
 import pandas as pd
-from skimage.measure import label, regionprops_table
+from skimage.measure import regionprops_table
+from scipy.ndimage import sum_labels
 from gridgen.logger import get_logger
+from gridgen.get_masks import _connected_components
 from functools import wraps
+from concurrent.futures import ThreadPoolExecutor
 import os
 import time
-# todo change to receive the logger from the main module
 def timeit(func):
+    """Time ``func`` through the package logger; a no-op unless GRIDGEN_TIMEIT is set."""
+    if not os.environ.get('GRIDGEN_TIMEIT'):
+        return func
+
+    # Resolve once at decoration time and log at INFO — get_logger re-pins the
+    # level on every call, which would silently drop per-call DEBUG records
+    logger = get_logger(__name__)
+
     @wraps(func)
     def wrapper(*args, **kwargs):
-        start = time.time()
+        start = time.perf_counter()
         result = func(*args, **kwargs)
-        end = time.time()
-        print(f"{func.__name__} took {end - start:.4f} seconds")
+        logger.info('%s took %.4f seconds', func.__name__, time.perf_counter() - start)
         return result
     return wrapper
 
@@ -119,15 +128,22 @@ class MorphologyExtractor:
             List[Dict[str, Any]]: List of features per grid tile.
         """
         h, w = mask.shape
+        g = grid_size
+
+        # Zero-pad to tile multiples, fold tiles onto their own axes and reduce
+        # once — all tile areas come out of a single vectorized sum
+        pad_h, pad_w = -h % g, -w % g
+        padded = np.pad(mask.astype(bool), ((0, pad_h), (0, pad_w)))
+        tile_areas = padded.reshape((h + pad_h) // g, g, (w + pad_w) // g, g).sum(axis=(1, 3))
+
         results = []
-        for y in range(0, h, grid_size):
-            for x in range(0, w, grid_size):
-                tile = mask[y:y+grid_size, x:x+grid_size]
-                tile_area = int(np.sum(tile))
+        for ty in range(tile_areas.shape[0]):
+            for tx in range(tile_areas.shape[1]):
+                x, y = tx * g, ty * g
                 object_id = f'{parent_id}_grid_{x}_{y}' if parent_id else f'grid_{x}_{y}'
                 results.append({
                     'x': x, 'y': y,
-                    'area': tile_area,
+                    'area': int(tile_areas[ty, tx]),
                     'object_id': object_id
                 })
         return results
@@ -149,13 +165,21 @@ class GeneCounter:
         Returns:
             List[Dict[str, Any]]: List of gene counts per object.
         """
+        present = np.nonzero(np.bincount(labeled_mask.ravel()))[0]
+        present = present[present != 0]
+        if present.size == 0:
+            return []
+
+        # ndimage's group reduction sums every object in one C sweep per gene,
+        # instead of a full-volume einsum per object
+        gene_items = list(target_dict.items())
+        per_object = np.empty((present.size, len(gene_items)), dtype=np.int64)
+        for col, (_, gene_idx) in enumerate(gene_items):
+            per_object[:, col] = sum_labels(array_counts[..., gene_idx], labels=labeled_mask, index=present)
+
         results = []
-        for obj_id in np.unique(labeled_mask):
-            if obj_id == 0:
-                continue
-            mask = labeled_mask == obj_id
-            counts = np.einsum('ijk,ij->k', array_counts.astype(np.int16), mask.astype(np.int16))
-            counts_dict = {gene: counts[i] for gene, i in target_dict.items()}
+        for row, obj_id in enumerate(present):
+            counts_dict = {gene: per_object[row, col] for col, (gene, _) in enumerate(gene_items)}
             counts_dict['object_id'] = obj_id
             results.append(counts_dict)
         return results
@@ -172,8 +196,9 @@ class GeneCounter:
         Returns:
             List[Dict[str, Any]]: Single-item list with gene counts.
         """
-        mask = mask.astype(bool)
-        counts = np.einsum('ijk,ij->k', array_counts.astype(np.int64), mask.astype(np.int64))
+        # The int64 mask promotes the accumulation dtype, so the full HxWxG
+        # volume no longer needs an astype copy per call
+        counts = np.einsum('ijk,ij->k', array_counts, mask.astype(np.int64))
         counts_dict = {gene: counts[i] for gene, i in target_dict.items()}
         counts_dict['object_id'] = 'bulk'
         return [counts_dict]
@@ -192,16 +217,25 @@ class GeneCounter:
             List[Dict[str, Any]]: List of gene counts per grid tile.
         """
         h, w = mask.shape
+        g = grid_size
+
+        # Zero-pad to tile multiples and reduce all tiles in one fused reshape-sum
+        # instead of a Python double loop with an einsum per tile
+        pad_h, pad_w = -h % g, -w % g
+        padded_mask = np.pad(mask.astype(bool), ((0, pad_h), (0, pad_w)))
+        padded_counts = np.pad(array_counts, ((0, pad_h), (0, pad_w), (0, 0)))
+        n_ty, n_tx = (h + pad_h) // g, (w + pad_w) // g
+        masked = padded_counts * padded_mask[..., None]
+        tile_counts = masked.reshape(n_ty, g, n_tx, g, -1).sum(axis=(1, 3))
+        tile_areas = padded_mask.reshape(n_ty, g, n_tx, g).sum(axis=(1, 3))
+
         results = []
-        for y in range(0, h, grid_size):
-            for x in range(0, w, grid_size):
-                sub_mask = mask[y:y+grid_size, x:x+grid_size].astype(bool)
-                if not np.any(sub_mask):
+        for ty in range(n_ty):
+            for tx in range(n_tx):
+                if tile_areas[ty, tx] == 0:
                     continue
-                counts = np.einsum('ijk,ij->k', array_counts[y:y + grid_size, x:x + grid_size].astype(np.int64),
-                                   sub_mask.astype(np.int64))
-                counts_dict = {gene: counts[i] for gene, i in target_dict.items()}
-                counts_dict['object_id'] = f'grid_{x}_{y}'
+                counts_dict = {gene: tile_counts[ty, tx, i] for gene, i in target_dict.items()}
+                counts_dict['object_id'] = f'grid_{tx * g}_{ty * g}'
                 results.append(counts_dict)
         return results
 
@@ -221,12 +255,24 @@ class HierarchyMapper:
         Returns:
             Dict[int, List[int]]: Mapping from source object ID to list of parent IDs.
         """
+        s = source_labels.ravel()
+        t = target_labels.ravel()
+
+        # One streaming pass: encode co-occurring (source, target) pairs into a
+        # single int64 key and dedupe, instead of a boolean-mask scan per source id
+        keep = (s > 0) & (t > 0)
+        stride = int(t.max()) + 1
+        pairs = np.unique(s[keep].astype(np.int64) * stride + t[keep])
+
         mapping = {}
-        for src_id in np.unique(source_labels):
-            if src_id == 0:
-                continue
-            overlap = target_labels[source_labels == src_id]
-            mapping[src_id] = list(np.unique(overlap[overlap > 0]))
+        for key in pairs:
+            src_id, tgt_id = divmod(int(key), stride)
+            mapping.setdefault(src_id, []).append(tgt_id)
+
+        # Sources with no foreground overlap still map to an empty list
+        for src_id in np.unique(s):
+            if src_id != 0:
+                mapping.setdefault(int(src_id), [])
         return mapping
 
 class MaskAnalysisPipeline:
@@ -256,49 +302,67 @@ class MaskAnalysisPipeline:
         """
         Run the full analysis pipeline on all mask definitions.
 
+        Definitions are independent and the underlying OpenCV/NumPy/scipy
+        kernels release the GIL, so they are analyzed on a thread pool.
+
         Returns:
             List[MaskAnalysisResult]: List of results per mask.
         """
 
         self.results.clear()
 
-        for defn in self.mask_definitions:
-            if defn.analysis_type == 'per_object':
-                labeled = label(defn.mask)
-                self.labeled_masks[defn.mask_name] = labeled
-                morpho = self.extractor.extract_per_object_features(labeled)
-                counts = self.counter.count_genes_per_object(labeled, self.array_counts, self.target_dict)
-                merged = self._merge_dicts_by_key(morpho, counts, 'object_id')
-
-            elif defn.analysis_type == 'bulk':
-                morpho = self.extractor.extract_bulk_features(defn.mask)
-                counts = self.counter.count_genes_bulk(defn.mask, self.array_counts, self.target_dict)
-                merged = self._merge_dicts_by_key(morpho, counts, 'object_id')
-
-            elif defn.analysis_type == 'grid':
-                if defn.grid_size is None:
-                    raise ValueError("Grid size required for grid analysis.")
-                morpho = self.extractor.extract_grid_features(defn.mask, defn.grid_size)
-                counts = self.counter.count_genes_grid(defn.mask, self.array_counts, self.target_dict, defn.grid_size)
-                merged = self._merge_dicts_by_key(morpho, counts, 'object_id') if counts else morpho
-
-            else:
-                raise ValueError(f"Unsupported analysis type: {defn.analysis_type}, should be one of 'per_object', 'bulk', or 'grid'.")
-
-            # Check for negative gene counts
-            for c in counts:
-                for gene, value in c.items():
-                    if gene != 'object_id' and value < 0:
-                        print(f"Warning: Negative count for gene '{gene}' in object '{c.get('object_id')}'")
-
-            for item in merged:
-                item['mask_name'] = defn.mask_name
-                item['analysis_type'] = defn.analysis_type
-
-            self.results.append(MaskAnalysisResult(defn.mask_name, defn.analysis_type, merged))
+        with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+            self.results = list(executor.map(self._analyze_definition, self.mask_definitions))
 
         return self.results
 
+    def _analyze_definition(self, defn: MaskDefinition) -> MaskAnalysisResult:
+        """
+        Analyze a single mask definition.
+
+        Thread-safe: each call writes only its own buffers; the labeled-mask
+        cache update is a single dict item assignment on a distinct key.
+
+        Args:
+            defn (MaskDefinition): The mask definition to analyze.
+
+        Returns:
+            MaskAnalysisResult: Result for this mask.
+        """
+        if defn.analysis_type == 'per_object':
+            labeled = _connected_components(defn.mask)
+            self.labeled_masks[defn.mask_name] = labeled
+            morpho = self.extractor.extract_per_object_features(labeled)
+            counts = self.counter.count_genes_per_object(labeled, self.array_counts, self.target_dict)
+            merged = self._merge_dicts_by_key(morpho, counts, 'object_id')
+
+        elif defn.analysis_type == 'bulk':
+            morpho = self.extractor.extract_bulk_features(defn.mask)
+            counts = self.counter.count_genes_bulk(defn.mask, self.array_counts, self.target_dict)
+            merged = self._merge_dicts_by_key(morpho, counts, 'object_id')
+
+        elif defn.analysis_type == 'grid':
+            if defn.grid_size is None:
+                raise ValueError("Grid size required for grid analysis.")
+            morpho = self.extractor.extract_grid_features(defn.mask, defn.grid_size)
+            counts = self.counter.count_genes_grid(defn.mask, self.array_counts, self.target_dict, defn.grid_size)
+            merged = self._merge_dicts_by_key(morpho, counts, 'object_id') if counts else morpho
+
+        else:
+            raise ValueError(f"Unsupported analysis type: {defn.analysis_type}, should be one of 'per_object', 'bulk', or 'grid'.")
+
+        # Check for negative gene counts
+        for c in counts:
+            for gene, value in c.items():
+                if gene != 'object_id' and value < 0:
+                    print(f"Warning: Negative count for gene '{gene}' in object '{c.get('object_id')}'")
+
+        for item in merged:
+            item['mask_name'] = defn.mask_name
+            item['analysis_type'] = defn.analysis_type
+
+        return MaskAnalysisResult(defn.mask_name, defn.analysis_type, merged)
+
     def get_results_df(self) -> pd.DataFrame:
         """
         Get all results concatenated into a single pandas DataFrame.
@@ -310,7 +374,22 @@ class MaskAnalysisPipeline:
         if not self.results:
             self.run()
         all_features = [item for r in self.results for item in r.features]
-        return pd.DataFrame(all_features)
+
+        # Assemble column-wise: one list per column lets pandas type each column
+        # in bulk instead of hashing and inferring dtypes per row of dicts,
+        # which dominates construction when genes number in the thousands
+        columns: Dict[str, list] = {}
+        for i, row in enumerate(all_features):
+            for col, value in row.items():
+                bucket = columns.get(col)
+                if bucket is None:
+                    bucket = columns[col] = [None] * i
+                bucket.append(value)
+            for bucket in columns.values():
+                if len(bucket) <= i:
+                    bucket.append(None)
+
+        return pd.DataFrame(columns)
 
     def _merge_dicts_by_key(self, list1: List[Dict[str, Any]], list2: List[Dict[str, Any]], key: str) -> List[Dict[str, Any]]:
         """
@@ -355,22 +434,24 @@ class MaskAnalysisPipeline:
 
         records = []
 
+        # Resolve masks by name once — avoids a linear scan of mask_definitions
+        # per child when many children share a parent
+        mask_by_name = {d.mask_name: d.mask for d in self.mask_definitions}
+        mapper = HierarchyMapper()
+
         for child_name, definition in hierarchy_definitions.items():
             reference_labels = definition["labels"]
             parent_name = definition["level_hierarchy"]
 
-            # Make sure both masks are labeled
+            # Make sure both masks are labeled; self.labeled_masks memoizes across calls
             if parent_name not in self.labeled_masks:
-                self.labeled_masks[parent_name] = label(
-                    next(d.mask for d in self.mask_definitions if d.mask_name == parent_name)
-                )
+                self.labeled_masks[parent_name] = _connected_components(mask_by_name[parent_name])
                 if save_dir:
                     os.makedirs(save_dir, exist_ok=True)
                     np.save(os.path.join(save_dir, f"{parent_name}_labeled.npy"), self.labeled_masks[parent_name])
 
             parent_labels = self.labeled_masks[parent_name]
 
-            mapper = HierarchyMapper()
             hierarchy_map = mapper.map_hierarchy(reference_labels, parent_labels)
 
             # Update results
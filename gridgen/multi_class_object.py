@@ -514,6 +514,9 @@ class MultiClassObjectAnalysis():
 
 
     def expand_mask(self, mask, expansion_distance):
+        # Non-mutating: cv2.dilate/subtract return fresh arrays
+        if cv2.countNonZero(mask) == 0:
+            return np.zeros_like(mask)
         kernel = np.ones((expansion_distance, expansion_distance), np.uint8)
         expanded_mask = cv2.dilate(mask, kernel, iterations=1)
         expanded_mask = cv2.subtract(expanded_mask, mask)
@@ -541,7 +544,7 @@ class MultiClassObjectAnalysis():
             # voronoi_mask = self.get_voronoi_mask(category_name)
             previous_expansion_mask = np.zeros((self.height, self.width), dtype=np.uint8)
             for expansion_distance in expansion_distances:
-                current_expansion_mask = self.expand_mask(mask.copy(), expansion_distance)
+                current_expansion_mask = self.expand_mask(mask, expansion_distance)
                 # Ensure the current expansion doesn't overlap with previous ones
                 current_expansion_mask = cv2.bitwise_and(current_expansion_mask,
                                                          cv2.bitwise_not(previous_expansion_mask))
@@ -576,7 +579,7 @@ class MultiClassObjectAnalysis():
             voronoi_mask = self.get_voronoi_mask(category_name)
             previous_expansion_mask = np.zeros((self.height, self.width), dtype=np.uint8)
             for expansion_distance in expansion_distances:
-                current_expansion_mask = self.expand_mask(mask.copy(), expansion_distance)
+                current_expansion_mask = self.expand_mask(mask, expansion_distance)
                 # Ensure the current expansion doesn't overlap with previous ones
                 current_expansion_mask = cv2.bitwise_and(current_expansion_mask,
                                                          cv2.bitwise_not(previous_expansion_mask))
@@ -383,11 +383,12 @@ class TestMultiClassObjectAnalysis(unittest.TestCase):
 
         # Make sure expansion doesn't spill out of Voronoi
         for label in range(1, 5):  # object labels are 1-indexed
-            mask = (ma.referenced_masks["ClassA_expansion_20"] == label).astype(np.uint8)
+            category = ma.class_labels[label - 1]
+            mask = (ma.referenced_masks[f"{category}_expansion_20"] == label).astype(np.uint8)
             point = ma.all_centroids[label - 1]
             self.assertGreater(np.sum(mask), 0, f"No expansion for object {label}")
 
-            voronoi_mask = ma.get_voronoi_mask(ma.class_labels[label - 1])
+            voronoi_mask = ma.get_voronoi_mask(category)
             intersection = np.logical_and(mask, voronoi_mask).astype(np.uint8)
             self.assertEqual(np.sum(mask), np.sum(intersection), f"Expansion for label {label} leaked Voronoi bounds")
 